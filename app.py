@@ -5,11 +5,12 @@
 # =============================================================
 
 from __future__ import annotations
-import streamlit as st, pandas as pd, plotly.graph_objects as go
+import streamlit as st, pandas as pd, numpy as np, plotly.graph_objects as go
 from pathlib import Path
-import os
+import hashlib, inspect, io, os, re, uuid
 from engine import (
     detect_pivots,
+    detect_bar_minutes,
     project_intervals,
     load_holiday_calendar,
     setup_debugger,
@@ -18,12 +19,18 @@ from engine import (
     generate_insights,
     filter_by_overlap_count,
     analyze_overlap_accuracy,
+    RollingWindows,
 )
 from engine.triangle import filter_pivots_by_triangle
 
 if os.getenv("DEBUG", "0") == "1":
     setup_debugger()
 
+_IV_RE = re.compile(r"(?:^|,)\s*(\d+)\s*(?=,|$)")  # comma-separated whole numbers only
+PRICE_COLUMNS = ("Date", "Open", "High", "Low", "Close")
+MAX_CANDLES = 5000  # candlestick bars sent to the browser before merging
+LAZY_TABS = "on_change" in inspect.signature(st.tabs).parameters  # newer Streamlit reports the open tab
+
 st.set_page_config(page_title="Time‑Cycle Strategy", layout="wide")
 st.title("📈 Time‑Cycle Overlap Visualiser (Unified)")
 
@@ -55,7 +62,7 @@ with st.sidebar:
 
     st.subheader("Interval list")
     iv_text = st.text_input("Comma‑separated intervals", "30,60,90,120,144,180,210,240,270,360")
-    iv_list = [int(x.strip()) for x in iv_text.split(",") if x.strip().isdigit()]
+    iv_list = tuple(map(int, _IV_RE.findall(iv_text)))
     use_bars = st.selectbox("Interval unit", ["Bars","Calendar Days"]) == "Bars"
     overlap_thr = st.number_input("Highlight threshold (≥ N overlaps)", 1,100,3,1)
 
@@ -72,50 +79,222 @@ with st.sidebar:
 
 # ---------------- Helper ----------------
 
+@st.cache_data(show_spinner=False, max_entries=8)
 @log_exceptions
-def _read_price_file(upload) -> pd.DataFrame:
-    suffix = Path(upload.name).suffix.lower()
-    df = pd.read_csv(upload) if suffix==".csv" else pd.read_excel(upload)
-    df.columns = [c.strip().title() for c in df.columns]
-    if df["Date"].astype(str).str.contains(":").any():
-        df["Date"] = pd.to_datetime(df["Date"], format="%d-%b-%Y %H:%M")
+def _read_price_file(data: bytes, name: str) -> pd.DataFrame:
+    suffix = Path(name).suffix.lower()
+    buf = io.BytesIO(data)
+    if suffix == ".csv":
+        df = pd.read_csv(buf, engine="pyarrow")
     else:
-        df["Date"] = pd.to_datetime(df["Date"], format="%d-%b-%Y")
-    return df.set_index("Date").sort_index()
-
-# ---------------- Run analysis ----------------
-
-if run_btn:
-    if not csv_file:
-        st.error("Please upload a price file first."); st.stop()
+        df = pd.read_excel(buf, engine="openpyxl", usecols=lambda c: str(c).strip().title() in PRICE_COLUMNS)
+    df.columns = [c.strip().title() for c in df.columns]
+    df = df[[c for c in df.columns if c in PRICE_COLUMNS]]
+    # All rows share one format, so the first value tells us whether the file is intraday
+    is_intraday = ":" in str(df["Date"].dropna().iloc[0])
+    date_fmt = "%d-%b-%Y %H:%M" if is_intraday else "%d-%b-%Y"
+    df["Date"] = pd.to_datetime(df["Date"], format=date_fmt, cache=True)
+    df = df.set_index("Date").sort_index()
+    # Prices are cast once the headers are normalised (read-time dtype= would need the raw names).
+    # Always float64: float32 only holds about 7 significant digits, too few above ~16384 at 2 decimals.
+    ohlc = ["Open", "High", "Low", "Close"]
+    df[ohlc] = df[ohlc].astype(np.float64)
+    df.attrs["is_intraday"] = is_intraday
+    return df
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _load_holidays(data: bytes, adhoc: tuple) -> np.ndarray:
+    holiday_file = io.BytesIO(data) if data else None
+    return load_holiday_calendar(uploaded_file_object=holiday_file, adhoc=list(adhoc))
+
+@st.cache_data(show_spinner=False, max_entries=8)
+@log_exceptions
+def _compute_pivots(_price_df: pd.DataFrame, price_key: str, pivot_range: int, min_move: float,
+                    triangle_items: tuple):
+    """Detect pivots and apply the triangle filter; returns (all, valid, filtered).
 
-    price_df = _read_price_file(csv_file)
-    is_intraday = price_df.index.astype(str).str.contains(":").any()
-    date_fmt    = "%d-%b-%Y %H:%M" if is_intraday else "%d-%b-%Y"
+    ``price_key`` (digest of the uploaded bytes) stands in for ``_price_df`` in the cache key.
+    """
+    price_df = _price_df
+    triangle_settings = dict(triangle_items)
 
-    holiday_set = load_holiday_calendar(uploaded_file_object=holiday_file,
-                                        adhoc=extra_holidays)
+    # Window extremes shared by pivot detection and the triangle filter (same range in this app)
+    rw = RollingWindows(price_df, pivot_range)
 
     # Get all pivots with validity tracking
-    all_pivots_with_validity = detect_pivots(price_df, pivot_range=int(pivot_range), min_move=min_move, return_all=True)
-    
+    all_pivots_with_validity = detect_pivots(price_df, pivot_range=pivot_range, min_move=min_move, return_all=True, rw=rw)
+
     # Filter to valid pivots for triangle analysis
     valid_pivots_df = all_pivots_with_validity[all_pivots_with_validity["valid"]].copy()
-    
+
     # Apply triangle filter to valid pivots
     if not valid_pivots_df.empty:
-        pivots_df = filter_pivots_by_triangle(price_df, valid_pivots_df, triangle_settings)
+        pivots_df = filter_pivots_by_triangle(price_df, valid_pivots_df, triangle_settings, rw)
     else:
         pivots_df = pd.DataFrame()  # Empty DataFrame if no valid pivots
-    
+
     # Add triangle rejection info to pivots that didn't pass triangle filter
-    if enable_triangle and not pivots_df.empty and not valid_pivots_df.empty:
+    if triangle_settings.get("enabled") and not pivots_df.empty and not valid_pivots_df.empty:
         triangle_rejected_ids = set(valid_pivots_df["idx"]) - set(pivots_df["idx"])
         for idx in triangle_rejected_ids:
             mask = all_pivots_with_validity["idx"] == idx
             all_pivots_with_validity.loc[mask, "valid"] = False
             all_pivots_with_validity.loc[mask, "rejection_reason"] = "Failed triangle filter criteria"
-    
+
+    return all_pivots_with_validity, valid_pivots_df, pivots_df
+
+@st.cache_data(show_spinner=False, max_entries=8)
+@log_exceptions
+def _bar_minutes(_price_df: pd.DataFrame, price_key: str, holiday_set: np.ndarray) -> int:
+    """Bar size of the uploaded data, kept across pivot and interval changes."""
+    return detect_bar_minutes(_price_df, holiday_set)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+@log_exceptions
+def _compute_interval_hits(pivots_df: pd.DataFrame, iv_tuple: tuple, use_bars: bool,
+                           _price_df: pd.DataFrame, price_key: str, holiday_set: np.ndarray) -> pd.DataFrame:
+    bar_minutes = _bar_minutes(_price_df, price_key, holiday_set) if use_bars else None
+    return pd.DataFrame(project_intervals(pivots_df, list(iv_tuple), use_bars, _price_df, holiday_set, bar_minutes),
+                        columns=["Source Pivot Date","Interval (Days)","Projected Date"])
+
+@st.cache_data(show_spinner=False, max_entries=8)
+@log_exceptions
+def _run_backtest(projections: pd.DataFrame, _price_df: pd.DataFrame, price_key: str, overlaps_count: dict,
+                  tolerance_window: int, min_success_candles: int, lookback_candles: int):
+    """Validate projections; returns (results, interval analysis, overlap analysis, insights)."""
+    validation_results, interval_stats = analyze_all_projections(
+        projections, _price_df, tolerance_window, min_success_candles, lookback_candles)
+    insights = generate_insights(interval_stats, validation_results)
+    interval_analysis = pd.DataFrame([
+        {
+            "Interval": i,
+            "Total Projections": s['total_count'],
+            "Successful": s['success_count'],
+            "Success Rate %": f"{s['success_rate']:.1f}",
+            "Immediate Reversals": s['immediate_reversals'],
+            "Immediate %": f"{s['immediate_reversal_rate']:.1f}",
+            "Avg Candles to Reversal": f"{s['avg_candles_to_reversal']:.1f}"
+        } for i, s in sorted(interval_stats.items()) if s['total_count'] > 0
+    ])
+    overlap_analysis = analyze_overlap_accuracy(validation_results, overlaps_count)
+    return pd.DataFrame(validation_results), interval_analysis, overlap_analysis, insights
+
+DISPLAY_DATE_FORMATS = {"%d-%b-%Y": "DD-MMM-YYYY", "%d-%b-%Y %H:%M": "DD-MMM-YYYY HH:mm"}
+MONTH_ABBR = np.array(["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])
+
+def _format_dates(dates, date_fmt: str) -> np.ndarray:
+    """Vectorised strftime for the app's two date formats; other formats go through pandas.
+
+    Each distinct timestamp is formatted once and mapped back, since source dates repeat per interval.
+    """
+    codes, uniques = pd.factorize(np.asarray(dates, dtype="datetime64[m]"), use_na_sentinel=False)
+    return _format_unique_dates(uniques, date_fmt)[codes]
+
+def _format_unique_dates(arr: np.ndarray, date_fmt: str) -> np.ndarray:
+    if date_fmt not in ("%d-%b-%Y", "%d-%b-%Y %H:%M"):
+        return pd.DatetimeIndex(arr).strftime(date_fmt).to_numpy(dtype=object)
+    # ISO strings ("YYYY-MM-DDTHH:MM") sliced into fixed-width parts
+    chars = np.datetime_as_string(arr, unit="m").astype("U16").view("U1").reshape(-1, 16)
+    def part(a: int, b: int) -> np.ndarray:
+        return np.ascontiguousarray(chars[:, a:b]).view(f"U{b - a}").ravel()
+    month = MONTH_ABBR[arr.astype("datetime64[M]").astype(np.int64) % 12]
+    out = np.char.add(np.char.add(np.char.add(np.char.add(part(8, 10), "-"), month), "-"), part(0, 4))
+    if date_fmt.endswith("%H:%M"):
+        out = np.char.add(np.char.add(out, " "), part(11, 16))
+    return out.astype(object)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _to_csv_bytes(df: pd.DataFrame, date_fmt: str) -> bytes:
+    """CSV export with datetime columns written in the app's display format."""
+    dates = df.select_dtypes("datetime").columns
+    return df.assign(**{c: _format_dates(df[c], date_fmt) for c in dates}).to_csv(index=False).encode("utf-8")
+
+def _date_columns(date_fmt: str, *names: str) -> dict:
+    """``column_config`` rendering native datetime columns like ``date_fmt`` (Streamlit takes moment.js formats)."""
+    fmt = DISPLAY_DATE_FORMATS.get(date_fmt, "DD-MMM-YYYY HH:mm")
+    return {name: st.column_config.DatetimeColumn(format=fmt) for name in names}
+
+def _new_figure() -> go.Figure:
+    """Empty chart with one named trace per layer; ``_update_figure`` fills in the data."""
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(name="Price"))
+    for t, color, sym in [("H", "red", "triangle-up"), ("L", "green", "triangle-down")]:
+        fig.add_trace(go.Scattergl(mode="markers", marker=dict(symbol=sym, size=9, color=color), name=f"Pivot {t}"))
+    fig.add_trace(go.Scattergl(mode="lines", line=dict(color="orange", width=1, dash="dot"),
+                               showlegend=False, hoverinfo="skip", name="Triangles"))
+    fig.add_trace(go.Scattergl(mode="lines", line=dict(color="purple", dash="dot"),
+                               showlegend=False, hoverinfo="skip", name="Overlaps"))
+    fig.update_layout(height=650, xaxis_rangeslider_visible=False)
+    return fig
+
+def _update_figure(fig: go.Figure, chart_data: tuple, prices_changed: bool) -> None:
+    """Refresh the chart traces in place; the candlestick is only rewritten when prices changed."""
+    price_df, pivots_df, overlaps_count, overlap_thr, triangle_settings = chart_data
+    if prices_changed:
+        candles = price_df
+        if len(price_df) > MAX_CANDLES:
+            # Merge every `stride` bars into one candle so long histories stay light in the browser
+            stride = -(-len(price_df) // MAX_CANDLES)
+            starts = np.arange(0, len(price_df), stride)
+            ends = np.append(starts[1:], len(price_df)) - 1
+            candles = pd.DataFrame({
+                "Open": price_df["Open"].to_numpy()[starts],
+                "High": np.maximum.reduceat(price_df["High"].to_numpy(), starts),
+                "Low": np.minimum.reduceat(price_df["Low"].to_numpy(), starts),
+                "Close": price_df["Close"].to_numpy()[ends],
+            }, index=price_df.index[starts])
+        fig.update_traces(selector=dict(name="Price"), x=candles.index, open=candles["Open"],
+                          high=candles["High"], low=candles["Low"], close=candles["Close"])
+
+    if not pivots_df.empty:
+        is_high = pivots_df["type"].to_numpy() == "H"
+        high_pivots, low_pivots = pivots_df[is_high], pivots_df[~is_high]
+    else:
+        high_pivots = low_pivots = pd.DataFrame(columns=["idx", "price"])
+    for t, pivs in [("H", high_pivots), ("L", low_pivots)]:
+        fig.update_traces(selector=dict(name=f"Pivot {t}"), x=pivs["idx"], y=pivs["price"])
+
+    # All triangles go into one trace, separated by NaT/NaN gaps
+    tri_x, tri_y = [], []
+    if triangle_settings.get("enabled") and triangle_settings.get("show_overlays") and "left_base_idx" in pivots_df.columns:
+        tri = pivots_df[pivots_df["left_base_idx"].notna()]
+        if not tri.empty:
+            gap = np.full(len(tri), np.datetime64("NaT"), dtype="datetime64[ns]")
+            lx = tri["left_base_idx"].to_numpy(dtype="datetime64[ns]")
+            rx = tri["right_base_idx"].to_numpy(dtype="datetime64[ns]")
+            ly, ry = tri["left_base_price"].to_numpy(np.float64), tri["right_base_price"].to_numpy(np.float64)
+            tri_x = np.column_stack([lx, tri["idx"].to_numpy(dtype="datetime64[ns]"), rx, lx, gap]).ravel()
+            tri_y = np.column_stack([ly, tri["price"].to_numpy(np.float64), ry, ly, np.full(len(tri), np.nan)]).ravel()
+    fig.update_traces(selector=dict(name="Triangles"), x=tri_x, y=tri_y)
+
+    # Overlap markers as a single trace of vertical segments separated by NaT/NaN gaps
+    y_min, y_max = price_df["Low"].to_numpy().min(), price_df["High"].to_numpy().max()
+    ov_dates = np.array(list(overlaps_count), dtype="datetime64[ns]")
+    ov_counts = np.fromiter(overlaps_count.values(), dtype=np.int64, count=len(overlaps_count))
+    keep_dates = ov_dates[ov_counts >= overlap_thr]
+    ov_x = np.repeat(keep_dates, 3)
+    ov_x[2::3] = np.datetime64("NaT")
+    ov_y = np.tile(np.array([y_min, y_max, np.nan]), len(keep_dates))
+    fig.update_traces(selector=dict(name="Overlaps"), x=ov_x, y=ov_y)
+
+# ---------------- Run analysis ----------------
+
+if run_btn:
+    if not csv_file:
+        st.error("Please upload a price file first."); st.stop()
+
+    price_bytes = csv_file.getvalue()
+    price_df = _read_price_file(price_bytes, csv_file.name)
+    price_key = hashlib.sha1(price_bytes).hexdigest()
+    is_intraday = price_df.attrs["is_intraday"]
+    date_fmt    = "%d-%b-%Y %H:%M" if is_intraday else "%d-%b-%Y"
+
+    holiday_set = _load_holidays(holiday_file.getvalue() if holiday_file else b"",
+                                 tuple(sorted(extra_holidays)))
+
+    all_pivots_with_validity, valid_pivots_df, pivots_df = _compute_pivots(
+        price_df, price_key, int(pivot_range), min_move, tuple(sorted(triangle_settings.items())))
+
     # Summary statistics
     total_potential = len(all_pivots_with_validity)
     total_valid = len(valid_pivots_df)
@@ -127,54 +306,37 @@ if run_btn:
         st.success(f"Found {total_potential} potential pivots: {total_valid} valid")
 
     if not pivots_df.empty:
-        interval_hits = pd.DataFrame(project_intervals(pivots_df, iv_list, use_bars, price_df, holiday_set),
-                                     columns=["Source Pivot Date","Interval (Days)","Projected Date"])
-        overlaps_full  = interval_hits.groupby("Projected Date")
+        interval_hits = _compute_interval_hits(pivots_df, iv_list, use_bars, price_df, price_key, holiday_set)
+        overlaps_full  = interval_hits.groupby("Projected Date", sort=False, observed=True)
         overlaps_count = overlaps_full.size().to_dict()
     else:
         interval_hits = pd.DataFrame(columns=["Source Pivot Date","Interval (Days)","Projected Date"])
-        overlaps_full = pd.DataFrame().groupby("Projected Date")
         overlaps_count = {}
 
-    backtest_results, interval_analysis, overlap_analysis, insights = None, None, None, []
-
+    # The backtest itself runs lazily in the Backtesting tab; only its inputs are kept here
+    backtest_pending = None
     if enable_backtesting:
-        projections = [(r["Source Pivot Date"], r["Interval (Days)"], r["Projected Date"]) for _, r in interval_hits.iterrows()]
+        projections = interval_hits
         filtered_projections = filter_by_overlap_count(projections, overlaps_count, min_overlap_filter) if min_overlap_filter > 0 else projections
         if min_overlap_filter > 0:
             st.info(f"Analyzing {len(filtered_projections)} projections with {min_overlap_filter}+ overlaps (out of {len(projections)} total)")
-
-        if filtered_projections:
-            validation_results, interval_stats = analyze_all_projections(
-                filtered_projections, price_df, tolerance_window, min_success_candles, lookback_candles)
-            insights = generate_insights(interval_stats, validation_results)
-            interval_analysis = pd.DataFrame([
-                {
-                    "Interval": i,
-                    "Total Projections": s['total_count'],
-                    "Successful": s['success_count'],
-                    "Success Rate %": f"{s['success_rate']:.1f}",
-                    "Immediate Reversals": s['immediate_reversals'],
-                    "Immediate %": f"{s['immediate_reversal_rate']:.1f}",
-                    "Avg Candles to Reversal": f"{s['avg_candles_to_reversal']:.1f}"
-                } for i, s in sorted(interval_stats.items()) if s['total_count'] > 0
-            ])
-            overlap_analysis = analyze_overlap_accuracy(validation_results, overlaps_count)
-            backtest_results = pd.DataFrame(validation_results)
-        else:
+        if not len(filtered_projections):
             st.warning(f"No projections found with {min_overlap_filter}+ overlaps")
+        backtest_pending = (filtered_projections, price_df, price_key, overlaps_count,
+                            tolerance_window, min_success_candles, lookback_candles)
 
     # Prepare pivot view with all pivots
-    piv_view = all_pivots_with_validity.copy() if show_invalid_pivots else pivots_df.copy()
-    piv_view["Pivot Date"] = piv_view["idx"].dt.strftime(date_fmt)
-    piv_view["Year"] = piv_view["idx"].dt.year
-    piv_view["Month"] = piv_view["idx"].dt.month
-    piv_view = piv_view.rename(columns={"type":"Type","price":"Price","abs_move":"Absolute Movement"})
+    piv_src = all_pivots_with_validity if show_invalid_pivots else pivots_df
+    piv_view = piv_src.rename(columns={"type":"Type","price":"Price","abs_move":"Absolute Movement"}).assign(**{
+        "Pivot Date": piv_src["idx"],
+        "Year": piv_src["idx"].dt.year.astype("int16"),
+        "Month": piv_src["idx"].dt.month.astype("int8"),
+    })
     
     # Add validity columns if showing invalid pivots
     if show_invalid_pivots:
-        piv_view["Valid"] = piv_view["valid"].map({True: "✓", False: "✗"})
-        piv_view["Comments"] = piv_view["rejection_reason"].fillna("")
+        piv_view = piv_view.assign(Valid=piv_src["valid"].map({True: "✓", False: "✗"}),
+                                   Comments=piv_src["rejection_reason"].fillna(""))
     
     # Add triangle info for valid pivots that passed triangle filter
     if "triangle_type" in pivots_df.columns and not pivots_df.empty:
@@ -185,33 +347,49 @@ if run_btn:
             piv_view["Triangle Type"] = piv_view["triangle_type"]
             piv_view["Symmetry Score"] = piv_view["symmetry_score"].round(1)
 
-    ov_view = pd.DataFrame([
-        {"Date": d.strftime(date_fmt), "Overlap Count": len(g),
-         "Source Dates": ", ".join(g["Source Pivot Date"].dt.strftime(date_fmt)),
-         "Intervals": ", ".join(g["Interval (Days)"].astype(str)),
-         "Year": d.year, "Month": d.month}
-        for d, g in overlaps_full if len(g) >= overlap_thr
-    ]).sort_values("Overlap Count", ascending=False) if overlaps_count else pd.DataFrame()
+    if overlaps_count:
+        # Drop dates below the threshold first, then stringify and aggregate the rest in one pass
+        counts = overlaps_full.size().rename("Overlap Count")
+        kept_hits = interval_hits[interval_hits["Projected Date"].isin(counts.index[counts >= overlap_thr])]
+        joined = (kept_hits.assign(_src_str=_format_dates(kept_hits["Source Pivot Date"], date_fmt),
+                                   _iv_str=kept_hits["Interval (Days)"].astype(str))
+                  .groupby("Projected Date", sort=False, observed=True)
+                  .agg(**{"Source Dates": ("_src_str", ", ".join),
+                          "Intervals": ("_iv_str", ", ".join)}))
+        ov_view = (counts.to_frame().join(joined, how="inner")
+                   .rename_axis("Projected Date")
+                   .reset_index()
+                   .sort_values(["Overlap Count", "Projected Date"], ascending=[False, True]))
+        proj_dates = ov_view["Projected Date"]
+        ov_view = ov_view.rename(columns={"Projected Date": "Date"}).assign(
+            Year=proj_dates.dt.year.astype("int16"), Month=proj_dates.dt.month.astype("int8"))
+    else:
+        ov_view = pd.DataFrame()
 
     st.session_state["pivots_view"] = piv_view
     st.session_state["overlaps_view"] = ov_view
+    st.session_state["date_fmt"] = date_fmt
     st.session_state["chart_data"] = (price_df, pivots_df, overlaps_count, overlap_thr, triangle_settings)
+    st.session_state["chart_key"] = uuid.uuid4().hex
+    st.session_state["price_key"] = price_key
     st.session_state["all_pivots_with_validity"] = all_pivots_with_validity
     st.session_state["show_invalid_pivots"] = show_invalid_pivots
-    st.session_state["backtest_results"] = (backtest_results, interval_analysis, overlap_analysis, insights, enable_backtesting)
+    st.session_state["backtest_pending"] = backtest_pending
 
 # ---------------- Display ----------------
 
 if "pivots_view" in st.session_state:
     pivots_view = st.session_state["pivots_view"]
     overlaps_view = st.session_state["overlaps_view"]
-    price_df, pivots_df, overlaps_count, overlap_thr, triangle_settings = st.session_state["chart_data"]
+    date_fmt = st.session_state["date_fmt"]
 
+    backtest_pending = st.session_state.get("backtest_pending")
     tabs = ["Pivots", "Overlaps"]
-    if len(st.session_state.get("backtest_results", [])) == 5 and st.session_state["backtest_results"][4]:
+    if backtest_pending is not None:
         tabs.append("Backtesting")
 
-    tab_objs = st.tabs(tabs)
+    # With stateful tabs a hidden Backtesting tab reports open=False and its work is skipped
+    tab_objs = st.tabs(tabs, key="result_tabs", on_change="rerun") if LAZY_TABS else st.tabs(tabs)
     pivot_tab, overlap_tab = tab_objs[0], tab_objs[1]
     backtest_tab = tab_objs[2] if len(tab_objs) == 3 else None
 
@@ -220,69 +398,68 @@ if "pivots_view" in st.session_state:
         yr_sel = st.selectbox("Year",  ["All"] + sorted(pivots_view["Year"].unique()), 0, key="pv_year")
         mn_sel = st.selectbox("Month", ["All"] + list(range(1,13)), 0, key="pv_month", format_func=lambda m: m if m=="All" else f"{m:02d}")
         
-        pv_f = pivots_view.copy()
-        if yr_sel != "All": pv_f = pv_f[pv_f["Year"] == yr_sel]
-        if mn_sel != "All": pv_f = pv_f[pv_f["Month"] == mn_sel]
+        mask = np.ones(len(pivots_view), dtype=bool)
+        if yr_sel != "All": mask &= pivots_view["Year"].to_numpy() == yr_sel
+        if mn_sel != "All": mask &= pivots_view["Month"].to_numpy() == mn_sel
         
         # Build columns list based on what's available
         cols = ["Pivot Date", "Type", "Price", "Absolute Movement"]
-        if "Valid" in pv_f.columns:
+        if "Valid" in pivots_view.columns:
             cols.extend(["Valid", "Comments"])
         for c in ["Triangle Type", "Symmetry Score"]:
-            if c in pv_f.columns:
+            if c in pivots_view.columns:
                 cols.append(c)
         
-        st.dataframe(pv_f[cols], use_container_width=True)
-        st.download_button("Download Pivot Table", pv_f[cols].to_csv(index=False).encode("utf-8"), "pivots.csv")
+        pv_f = pivots_view.loc[mask, cols]
+        st.dataframe(pv_f, use_container_width=True, column_config=_date_columns(date_fmt, "Pivot Date"))
+        st.download_button("Download Pivot Table", _to_csv_bytes(pv_f, date_fmt), "pivots.csv")
 
     with overlap_tab:
         st.subheader("Overlap Dates")
         if not overlaps_view.empty:
             yr2 = st.selectbox("Year",  ["All"] + sorted(overlaps_view["Year"].unique()), 0, key="ov_year")
             mn2 = st.selectbox("Month", ["All"] + list(range(1,13)), 0, key="ov_month", format_func=lambda m: m if m=="All" else f"{m:02d}")
-            ov_f = overlaps_view.copy()
-            if yr2 != "All": ov_f = ov_f[ov_f["Year"] == yr2]
-            if mn2 != "All": ov_f = ov_f[ov_f["Month"] == mn2]
-            st.dataframe(ov_f.drop(columns=["Year", "Month"]), use_container_width=True)
-            st.download_button("Download Overlap Table", ov_f.drop(columns=["Year", "Month"]).to_csv(index=False).encode("utf-8"), "overlaps.csv")
+            mask = np.ones(len(overlaps_view), dtype=bool)
+            if yr2 != "All": mask &= overlaps_view["Year"].to_numpy() == yr2
+            if mn2 != "All": mask &= overlaps_view["Month"].to_numpy() == mn2
+            ov_f = overlaps_view.loc[mask, overlaps_view.columns.difference(["Year", "Month"], sort=False)]
+            st.dataframe(ov_f, use_container_width=True, column_config=_date_columns(date_fmt, "Date"))
+            st.download_button("Download Overlap Table", _to_csv_bytes(ov_f, date_fmt), "overlaps.csv")
         else:
             st.info("No overlap dates found with the current settings.")
 
-    if backtest_tab:
-        backtest_results, interval_analysis, overlap_analysis, insights, _ = st.session_state["backtest_results"]
+    if backtest_tab and getattr(backtest_tab, "open", None) is not False:
+        projections, price_df, price_key, overlaps_count, *settings = backtest_pending
+        backtest_results, interval_analysis, overlap_analysis, insights = None, None, None, []
+        if len(projections):
+            backtest_results, interval_analysis, overlap_analysis, insights = _run_backtest(
+                projections, price_df, price_key, overlaps_count, *settings)
         with backtest_tab:
             st.subheader("Interval Performance Analysis")
             if insights: st.info("\n\n".join(insights))
             if interval_analysis is not None and not interval_analysis.empty:
                 st.dataframe(interval_analysis.sort_values("Success Rate %", ascending=False), use_container_width=True)
-                st.download_button("Download Interval Analysis", interval_analysis.to_csv(index=False).encode("utf-8"), "interval_analysis.csv")
+                st.download_button("Download Interval Analysis", _to_csv_bytes(interval_analysis, date_fmt), "interval_analysis.csv")
             if overlap_analysis is not None and not overlap_analysis.empty:
                 st.subheader("Success Rate by Overlap Count")
                 st.dataframe(overlap_analysis.sort_values("Overlap Count", ascending=False), use_container_width=True)
-                st.download_button("Download Overlap Analysis", overlap_analysis.to_csv(index=False).encode("utf-8"), "overlap_analysis.csv")
+                st.download_button("Download Overlap Analysis", _to_csv_bytes(overlap_analysis, date_fmt), "overlap_analysis.csv")
             if backtest_results is not None:
                 if st.checkbox("Show detailed validation results"):
                     st.subheader("Detailed Validation Results")
                     df = backtest_results[['source_date', 'interval', 'projected_date', 'success', 'candles_to_reversal', 'prior_trend', 'reason']]
-                    df['source_date'] = df['source_date'].dt.strftime(date_fmt)
-                    df['projected_date'] = df['projected_date'].dt.strftime(date_fmt)
-                    st.dataframe(df, use_container_width=True)
+                    st.dataframe(df, use_container_width=True,
+                                 column_config=_date_columns(date_fmt, "source_date", "projected_date"))
 
     # ----- Chart -----
-    fig = go.Figure()
-    fig.add_trace(go.Candlestick(x=price_df.index, open=price_df["Open"], high=price_df["High"], low=price_df["Low"], close=price_df["Close"], name="Price"))
-    for t, color, sym in [("H", "red", "triangle-up"), ("L", "green", "triangle-down")]:
-        pivs = pivots_df.query(f'type == "{t}"')
-        fig.add_trace(go.Scatter(x=pivs["idx"], y=pivs["price"], mode="markers", marker=dict(symbol=sym, size=9, color=color), name=f"Pivot {t}"))
-    if triangle_settings.get("enabled") and triangle_settings.get("show_overlays"):
-        for _, pivot in pivots_df.iterrows():
-            if "triangle_info" in pivot and pd.notna(pivot.get("triangle_info")):
-                info = pivot["triangle_info"]
-                fig.add_trace(go.Scatter(x=[info["left_base_idx"], pivot["idx"], info["right_base_idx"], info["left_base_idx"]],
-                                         y=[info["left_base_price"], pivot["price"], info["right_base_price"], info["left_base_price"]],
-                                         mode="lines", line=dict(color="orange", width=1, dash="dot"), showlegend=False, hoverinfo="skip"))
-    for dt, cnt in overlaps_count.items():
-        if cnt >= overlap_thr:
-            fig.add_shape(type="line", x0=dt, x1=dt, y0=price_df["Low"].min(), y1=price_df["High"].max(), line=dict(color="purple", dash="dot"))
-    fig.update_layout(height=650, xaxis_rangeslider_visible=False)
+    # One figure per session; traces are refreshed only after a new analysis run
+    if "fig" not in st.session_state:
+        st.session_state["fig"] = _new_figure()
+        st.session_state["fig_price_key"] = None
+    fig = st.session_state["fig"]
+    if st.session_state.get("fig_key") != st.session_state["chart_key"]:
+        _update_figure(fig, st.session_state["chart_data"],
+                       prices_changed=st.session_state["fig_price_key"] != st.session_state["price_key"])
+        st.session_state["fig_key"] = st.session_state["chart_key"]
+        st.session_state["fig_price_key"] = st.session_state["price_key"]
     st.plotly_chart(fig, use_container_width=True)
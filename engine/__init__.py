@@ -3,18 +3,21 @@
 # ─────────────────────────────────────────────────────────────
 """Engine package — exposes top‑level helpers."""
 from .pivots import detect_pivots
-from .intervals import project_intervals, count_overlaps
-from .holidays import load_holiday_calendar, is_business_day
+from .intervals import detect_bar_minutes, project_intervals, count_overlaps
+from .holidays import load_holiday_calendar, is_business_day, are_business_days
 from .debugger import setup_debugger, log_exceptions
 from .triangle import filter_pivots_by_triangle, analyze_triangle_formation
+from ._rolling import RollingWindows
 from .backtesting import analyze_all_projections, generate_insights, filter_by_overlap_count, analyze_overlap_accuracy
 
 __all__ = [
     "detect_pivots",
     "project_intervals",
     "count_overlaps",
+    "detect_bar_minutes",
     "load_holiday_calendar",
     "is_business_day",
+    "are_business_days",
     "setup_debugger",
     "log_exceptions",
     "filter_pivots_by_triangle",
@@ -23,4 +26,5 @@ __all__ = [
     "generate_insights",
     "filter_by_overlap_count",
     "analyze_overlap_accuracy",
+    "RollingWindows",
 ]
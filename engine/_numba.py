@@ -0,0 +1,11 @@
+# =============================================================
+# File: engine/_numba.py – Optional Numba JIT support
+# =============================================================
+"""Numba is optional: without it ``njit`` is a no-op and kernels run as plain Python."""
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - depends on the environment
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
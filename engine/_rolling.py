@@ -0,0 +1,62 @@
+# =============================================================
+# File: engine/_rolling.py – Sliding-window extremes shared by pivots and triangles
+# =============================================================
+"""Rolling highs/lows computed once per price frame and pivot range."""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from ._numba import njit
+
+
+@njit(cache=True)
+def _rolling_extreme(values: np.ndarray, window: int, find_max: bool):
+    """Position and value of the extreme of each trailing ``window`` of values, in O(N).
+
+    A monotonic deque of positions holds the candidates; every position is pushed and popped
+    at most once. Only strictly worse candidates are popped, so ties resolve to the first
+    occurrence (as ``idxmax``/``idxmin``). NaNs are never chosen as the position, but a window
+    holding one reports a NaN value (as ``ndarray.max``/``min``).
+    """
+    n = len(values)
+    positions = np.empty(n, dtype=np.int64)
+    extremes = np.empty(n, dtype=values.dtype)
+    deque = np.empty(n, dtype=np.int64)
+    head, tail = 0, 0
+    last_nan = -window - 1
+    for i in range(n):
+        v = values[i]
+        if v != v:
+            last_nan = i
+        else:
+            while tail > head and ((values[deque[tail - 1]] < v) if find_max else (values[deque[tail - 1]] > v)):
+                tail -= 1
+            deque[tail] = i
+            tail += 1
+        while tail > head and deque[head] <= i - window:
+            head += 1
+        positions[i] = deque[head] if tail > head else i
+        extremes[i] = values[last_nan] if last_nan > i - window else values[positions[i]]
+    return positions, extremes
+
+
+def _padded(values: np.ndarray, window: int) -> np.ndarray:
+    """Values followed by ``window`` NaNs, keeping a float dtype (ints become float64)."""
+    if values.dtype.kind != "f":
+        values = values.astype(np.float64)
+    return np.concatenate([values, np.full(window, np.nan, dtype=values.dtype)])
+
+
+class RollingWindows:
+    """Window extremes of a frame's highs and lows for one pivot range.
+
+    Entry ``i`` covers bars ``i-window+1 .. i``, so the bars before a pivot at ``p`` are read at
+    ``p-1`` and the bars after it at ``p+window``. Arrays carry ``window`` NaN bars of padding,
+    so windows running past the last bar are cut short rather than out of bounds.
+    """
+
+    def __init__(self, df: pd.DataFrame, window: int):
+        if window < 1:
+            raise ValueError("pivot_range must be at least 1")
+        self.window = window
+        self.high_argmax, self.high_max = _rolling_extreme(_padded(df["High"].to_numpy(), window), window, True)
+        self.low_argmin, self.low_min = _rolling_extreme(_padded(df["Low"].to_numpy(), window), window, False)
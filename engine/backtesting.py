@@ -5,120 +5,64 @@
 from __future__ import annotations
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Tuple, Union
 from .debugger import log_exceptions
+from ._numba import njit
 
 
-@log_exceptions
-def get_trend_before(
-    price_data: pd.DataFrame,
-    projected_date: pd.Timestamp,
-    lookback: int = 5
-) -> Optional[str]:
-    """Determine market trend leading into projected date."""
-    try:
-        before_idx = price_data.index.get_loc(projected_date)
-        if before_idx < lookback:
-            return None
-        
-        before_candles = price_data.iloc[before_idx-lookback:before_idx]
-        
-        # Calculate trend using linear regression slope
-        closes = before_candles['Close'].values
-        x = np.arange(len(closes))
-        slope = np.polyfit(x, closes, 1)[0]
-        
-        return "UP" if slope > 0 else "DOWN"
-    except:
-        return None
+def _trend_weights(lookback: int) -> np.ndarray:
+    """Centred x positions whose dot product with closes has the slope's sign."""
+    return np.arange(lookback) - (lookback - 1) / 2
 
 
-@log_exceptions
-def validate_reversal(
-    price_data: pd.DataFrame,
-    projected_date: pd.Timestamp,
-    source_pivot_type: str,
-    tolerance_window: int,
-    min_success_candles: int = 1
-) -> Dict:
-    """Check if reversal occurred within tolerance window."""
-    
-    # Check if projected date exists in data
-    if projected_date not in price_data.index:
-        return {
-            'success': False,
-            'reversal_date': None,
-            'candles_to_reversal': 0,
-            'prior_trend': None,
-            'reason': 'Projected date not in data'
-        }
-    
-    # Get trend before projected date
-    prior_trend = get_trend_before(price_data, projected_date)
-    if prior_trend is None:
-        return {
-            'success': False,
-            'reversal_date': None,
-            'candles_to_reversal': 0,
-            'prior_trend': None,
-            'reason': 'Insufficient data before projection'
-        }
-    
-    # Get projected date candle
-    proj_idx = price_data.index.get_loc(projected_date)
-    proj_candle = price_data.iloc[proj_idx]
-    
-    # Check if we have enough future data
-    if proj_idx + tolerance_window >= len(price_data):
-        return {
-            'success': False,
-            'reversal_date': None,
-            'candles_to_reversal': 0,
-            'prior_trend': prior_trend,
-            'reason': 'Insufficient future data'
-        }
-    
-    # Get future candles
-    future_candles = price_data.iloc[proj_idx+1:proj_idx+tolerance_window+1]
-    
-    reversal_candle = None
-    candles_to_reversal = 0
-    consecutive_count = 0
-    
-    for i, (date, candle) in enumerate(future_candles.iterrows(), 1):
-        if prior_trend == "UP":
-            # Was going up, should start going down
-            if candle['Close'] < proj_candle['Close']:
-                consecutive_count += 1
-                if consecutive_count >= min_success_candles:
-                    reversal_candle = date
-                    candles_to_reversal = i - min_success_candles + 1
+@njit(cache=True)
+def _reversal_kernel(closes, proj_idx, is_up, tolerance, min_run):
+    """Candles to the first run of ``min_run`` reversal closes per projection (0 = none)."""
+    n = len(proj_idx)
+    candles = np.zeros(n, dtype=np.int64)
+    for p in range(n):
+        start = proj_idx[p]
+        base = closes[start]
+        count = 0
+        for j in range(1, tolerance + 1):
+            close = closes[start + j]
+            reversed_ = close < base if is_up[p] else close > base
+            if reversed_:
+                count += 1
+                if count >= min_run:
+                    candles[p] = j - min_run + 1
                     break
             else:
-                consecutive_count = 0
-        else:  # DOWN
-            # Was going down, should start going up
-            if candle['Close'] > proj_candle['Close']:
-                consecutive_count += 1
-                if consecutive_count >= min_success_candles:
-                    reversal_candle = date
-                    candles_to_reversal = i - min_success_candles + 1
-                    break
-            else:
-                consecutive_count = 0
-    
-    return {
-        'success': reversal_candle is not None,
-        'reversal_date': reversal_candle,
-        'candles_to_reversal': candles_to_reversal,
-        'prior_trend': prior_trend,
-        'reason': 'Success' if reversal_candle else 'No reversal within window'
-    }
+                count = 0
+    return candles
+
+
+Projections = Union[List[Tuple[pd.Timestamp, int, pd.Timestamp]], pd.DataFrame]
+
+
+def _projection_columns(projections: Projections) -> Tuple[list, list, list]:
+    """Split projections into source date, interval and projected date lists.
+
+    Accepts ``(source, interval, projected)`` tuples or a DataFrame holding
+    those three columns in that order.
+    """
+    if isinstance(projections, pd.DataFrame):
+        return tuple(projections[col].tolist() for col in projections.columns[:3])
+    if not projections:
+        return [], [], []
+    return tuple(list(col) for col in zip(*projections))
+
+
+def _bar_positions(bar_ns: np.ndarray, dates: list) -> np.ndarray:
+    """Positions of ``dates`` in the sorted int64-ns bar index, -1 where a date has no bar."""
+    dates_ns = pd.DatetimeIndex(dates).as_unit("ns").asi8
+    return np.where(np.isin(dates_ns, bar_ns), np.searchsorted(bar_ns, dates_ns), -1)
 
 
 @log_exceptions
 def analyze_all_projections(
-    projections: List[Tuple[pd.Timestamp, int, pd.Timestamp]],
+    projections: Projections,
     price_data: pd.DataFrame,
     tolerance_window: int,
     min_success_candles: int = 1,
@@ -126,32 +70,52 @@ def analyze_all_projections(
 ) -> Tuple[List[Dict], Dict]:
     """Validate all projections and analyze by interval."""
     
-    validation_results = []
+    closes = price_data['Close'].to_numpy(dtype=np.float64)
+    source_dates, intervals, proj_dates = _projection_columns(projections)
+    n_proj = len(proj_dates)
     
-    for source_date, interval, proj_date in projections:
-        # Determine source pivot type from price data
-        source_idx = price_data.index.get_loc(source_date)
-        
-        # Simple heuristic: if price is near high, it's a high pivot
-        source_candle = price_data.iloc[source_idx]
-        if abs(source_candle['High'] - source_candle['Close']) < abs(source_candle['Close'] - source_candle['Low']):
-            source_type = "H"
-        else:
-            source_type = "L"
-        
-        result = validate_reversal(
-            price_data, 
-            proj_date, 
-            source_type, 
-            tolerance_window,
-            min_success_candles
+    # Resolve every projected date to a bar position at once (index is time-sorted); -1 marks dates outside the data
+    bar_ns = price_data.index.as_unit("ns").asi8
+    proj_idx = _bar_positions(bar_ns, proj_dates)
+    
+    # Trend slopes for every projection in one matrix-vector product
+    slopes = np.full(n_proj, np.nan)
+    has_history = proj_idx >= lookback_candles
+    if has_history.any():
+        windows = sliding_window_view(closes, lookback_candles)
+        slopes[has_history] = windows[proj_idx[has_history] - lookback_candles] @ _trend_weights(lookback_candles)
+    has_trend = ~np.isnan(slopes)
+    is_up = slopes > 0
+    
+    # Reversal: first run of `min_success_candles` closes beyond the projected close
+    has_future = (proj_idx >= 0) & (proj_idx + tolerance_window < len(closes))
+    testable = has_trend & has_future
+    candles_to_reversal = np.zeros(n_proj, dtype=np.int64)
+    if testable.any():
+        candles_to_reversal[testable] = _reversal_kernel(
+            closes, proj_idx[testable], is_up[testable], tolerance_window, min_success_candles
+        )
+    success = candles_to_reversal > 0
+    reversal_dates = price_data.index[np.where(success, proj_idx + candles_to_reversal + min_success_candles - 1, 0)]
+    
+    prior_trends = np.where(has_trend, np.where(is_up, "UP", "DOWN"), None)
+    reasons = np.select(
+        [proj_idx < 0, ~has_trend, ~has_future, success],
+        ['Projected date not in data', 'Insufficient data before projection', 'Insufficient future data', 'Success'],
+        default='No reversal within window'
+    )
+    success_list = success.tolist()
+    reversal_list = [date if ok else None for date, ok in zip(reversal_dates, success_list)]
+    
+    # Assemble the result dicts from whole columns instead of per-row array lookups
+    keys = ('success', 'reversal_date', 'candles_to_reversal', 'prior_trend', 'reason',
+            'source_date', 'interval', 'projected_date')
+    validation_results = [
+        dict(zip(keys, row)) for row in zip(
+            success_list, reversal_list, candles_to_reversal.tolist(), prior_trends.tolist(), reasons.tolist(),
+            source_dates, intervals, proj_dates
         )
-        
-        result['source_date'] = source_date
-        result['interval'] = interval
-        result['projected_date'] = proj_date
-        
-        validation_results.append(result)
+    ]
     
     # Analyze by interval
     interval_stats = analyze_intervals(validation_results)
@@ -163,49 +127,48 @@ def analyze_all_projections(
 def analyze_intervals(validation_results: List[Dict]) -> Dict:
     """Find which intervals appear most in successful predictions."""
     
-    interval_stats = {}
+    if not validation_results:
+        return {}
     
-    for result in validation_results:
-        interval = result['interval']
-        
-        if interval not in interval_stats:
-            interval_stats[interval] = {
-                'total_count': 0,
-                'success_count': 0,
-                'immediate_reversals': 0,  # within 1 candle
-                'total_candles_to_reversal': 0,
-                'reversal_dates': []
-            }
-        
-        interval_stats[interval]['total_count'] += 1
-        
-        if result['success']:
-            interval_stats[interval]['success_count'] += 1
-            interval_stats[interval]['total_candles_to_reversal'] += result['candles_to_reversal']
-            interval_stats[interval]['reversal_dates'].append(result['projected_date'])
-            
-            if result['candles_to_reversal'] == 1:
-                interval_stats[interval]['immediate_reversals'] += 1
+    results = pd.DataFrame(validation_results, columns=['interval', 'success', 'candles_to_reversal', 'projected_date'])
+    success = results['success'].astype(bool)
+    results = results.assign(
+        success_candles=results['candles_to_reversal'].where(success, 0),
+        immediate=success & (results['candles_to_reversal'] == 1),  # within 1 candle
+    )
+    
+    stats = results.groupby('interval', sort=False).agg(
+        total_count=('success', 'size'),
+        success_count=('success', 'sum'),
+        immediate_reversals=('immediate', 'sum'),
+        total_candles_to_reversal=('success_candles', 'sum'),
+    )
     
     # Calculate success rates and averages
-    for interval, stats in interval_stats.items():
-        stats['success_rate'] = (stats['success_count'] / stats['total_count'] * 100) if stats['total_count'] > 0 else 0
-        stats['immediate_reversal_rate'] = (stats['immediate_reversals'] / stats['total_count'] * 100) if stats['total_count'] > 0 else 0
-        if stats['success_count'] > 0:
-            stats['avg_candles_to_reversal'] = stats['total_candles_to_reversal'] / stats['success_count']
-        else:
-            stats['avg_candles_to_reversal'] = 0
+    stats['success_rate'] = stats['success_count'] / stats['total_count'] * 100
+    stats['immediate_reversal_rate'] = stats['immediate_reversals'] / stats['total_count'] * 100
+    stats['avg_candles_to_reversal'] = (
+        stats['total_candles_to_reversal'] / stats['success_count']
+    ).where(stats['success_count'] > 0, 0)
+    
+    reversal_dates = results[success].groupby('interval', sort=False)['projected_date'].agg(list).to_dict()
+    interval_stats = stats.to_dict('index')
+    for interval, interval_stat in interval_stats.items():
+        interval_stat['reversal_dates'] = reversal_dates.get(interval, [])
     
     return interval_stats
 
 
 @log_exceptions
 def filter_by_overlap_count(
-    projections: List[Tuple[pd.Timestamp, int, pd.Timestamp]],
+    projections: Projections,
     overlap_counts: Dict[pd.Timestamp, int],
     min_overlap: int
-) -> List[Tuple[pd.Timestamp, int, pd.Timestamp]]:
+) -> Projections:
     """Filter projections to only include those with minimum overlap count."""
+    if isinstance(projections, pd.DataFrame):
+        return projections[projections.iloc[:, 2].map(overlap_counts) >= min_overlap]
+    
     filtered = []
     for source_date, interval, proj_date in projections:
         if proj_date in overlap_counts and overlap_counts[proj_date] >= min_overlap:
@@ -272,17 +235,23 @@ def generate_insights(interval_stats: Dict, validation_results: List[Dict]) -> L
         if top_intervals:
             insights.append(f"Top performing intervals: {', '.join(top_intervals)}")
     
+    # Success, immediate-reversal and reversal-speed tallies in one pass
+    total_success = immediate_count = total_candles = 0
+    for r in validation_results:
+        if r['success']:
+            total_success += 1
+            total_candles += r['candles_to_reversal']
+            if r['candles_to_reversal'] == 1:
+                immediate_count += 1
+    
     # Immediate reversal rate
-    total_success = sum(1 for r in validation_results if r['success'])
-    immediate_count = sum(1 for r in validation_results if r['success'] and r['candles_to_reversal'] == 1)
     if total_success > 0:
         immediate_rate = immediate_count / total_success * 100
         insights.append(f"{immediate_rate:.0f}% of successful reversals occurred immediately (next candle)")
     
     # Average reversal speed
-    all_candles_to_reversal = [r['candles_to_reversal'] for r in validation_results if r['success']]
-    if all_candles_to_reversal:
-        avg_speed = np.mean(all_candles_to_reversal)
+    if total_success > 0:
+        avg_speed = total_candles / total_success
         insights.append(f"Average reversal occurs within {avg_speed:.1f} candles of projection")
     
     # Overall success rate
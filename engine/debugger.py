@@ -1,8 +1,12 @@
 import logging
+import os
 import traceback
 from functools import wraps
 from typing import Callable, Any
 
+# Read once at import: without DEBUG=1 the decorator hands functions back unwrapped
+_DEBUG = os.getenv("DEBUG", "0") == "1"
+
 
 def setup_debugger(log_file: str = "debug.log", level: int = logging.DEBUG) -> None:
     """Configure root logger for debugging."""
@@ -17,7 +21,9 @@ def setup_debugger(log_file: str = "debug.log", level: int = logging.DEBUG) -> N
 
 
 def log_exceptions(func: Callable) -> Callable:
-    """Decorator to log exceptions from the wrapped function."""
+    """Decorator to log exceptions from the wrapped function (only active with DEBUG=1)."""
+    if not _DEBUG:
+        return func
 
     @wraps(func)
     def wrapper(*args: Any, **kwargs: Any) -> Any:
@@ -3,89 +3,94 @@
 # Corrected: 10-May-2025 (Accurate Bar Projection + Future Projection Enabled)
 # =============================================================
 from __future__ import annotations
+import numpy as np
 import pandas as pd
-from .holidays import is_business_day
+from .holidays import are_business_days
 from .debugger import log_exceptions
 
+@log_exceptions
+def detect_bar_minutes(original_df: pd.DataFrame, holiday_set: np.ndarray) -> int:
+    """Bar size in minutes of the intraday data, from its market-hours bars on business days."""
+    # 1) Restrict to market hours (intraday bars); only the index is needed, so no frame is copied
+    bars = original_df.index[original_df.index.indexer_between_time("09:15", "15:29")]
+
+    # 2) Exclude weekends & holidays
+    bars = bars[are_business_days(bars, holiday_set)]
+
+    # 3) Determine bar-size in minutes from filtered data: the most common gap between consecutive bars,
+    # so missing bars and overnight gaps do not skew it
+    if len(bars) < 2:
+        raise ValueError("Need at least two intraday bars in the 09:15-15:30 session to detect the bar size")
+    gaps, counts = np.unique(np.diff(bars.to_numpy()), return_counts=True)
+    gap = gaps[np.argmax(counts)]
+    minutes, remainder = divmod(gap, np.timedelta64(1, "m"))
+    if minutes < 1 or remainder:
+        raise ValueError(f"Bar size must be a whole number of minutes, got {pd.Timedelta(gap)}")
+    return int(minutes)
+
 @log_exceptions
 def project_intervals(
     pivots_df: pd.DataFrame,
     intervals: list[int],
     use_bars: bool,
     original_df: pd.DataFrame,
-    holiday_set: set[pd.Timestamp],
+    holiday_set: np.ndarray,
+    bar_minutes: int | None = None,
 ) -> list[tuple[pd.Timestamp, int, pd.Timestamp]]:
-    results: list[tuple[pd.Timestamp, int, pd.Timestamp]] = []
-
-    if use_bars:
-        # 1) Restrict to market hours (intraday bars)
-        df_bars = original_df.between_time("09:15", "15:29")
-
-        # 2) Exclude weekends & holidays
-        mask = df_bars.index.to_series().apply(
-            lambda ts: ts.weekday() < 5 and is_business_day(ts, holiday_set)
-        )
-        df_bars = df_bars[mask]
-
-        # 3) Determine bar-size in minutes from filtered data
-        interval_minutes = int((df_bars.index[1] - df_bars.index[0]).total_seconds() // 60)
-
-        # Function to get the next valid trading day
-        def next_valid_day(current_time, holiday_set):
-            next_day = current_time + pd.Timedelta(days=1)
-            while next_day.weekday() >= 5 or next_day.date() in holiday_set:
-                next_day += pd.Timedelta(days=1)
-            return next_day.replace(hour=9, minute=15)
-
-        # 4) Project for each pivot & each interval
-        for pivot_ts in pivots_df["idx"].sort_values():
-            for iv in intervals:
-                total_bars = iv
-                projected_time = pivot_ts
+    """Project every interval forward from every pivot.
 
-                while total_bars > 0:
-                    # Last valid bar start today (even if beyond data)
-                    last_start = projected_time.normalize().replace(
-                        hour=15, minute=30 - interval_minutes)
-
-                    if projected_time >= last_start:
-                        projected_time = next_valid_day(projected_time, holiday_set)
-                        continue
-
-                    # Calculate available bars today (or future)
-                    bars_today = int((last_start - projected_time).total_seconds() // (interval_minutes * 60))
-
-                    if bars_today <= 0:
-                        projected_time = next_valid_day(projected_time, holiday_set)
-                        continue
-
-                    # Consume bars (either all remaining or today's capacity)
-                    bars_to_consume = min(total_bars, bars_today)
-                    projected_time += pd.Timedelta(minutes=bars_to_consume * interval_minutes)
-                    total_bars -= bars_to_consume
-
-                # Append even if future date
-                results.append((pivot_ts, iv, projected_time))
-
-        return results
-
-    # --- Calendar-days mode (unchanged) ------------------------
-    for pivot_ts in pivots_df["idx"].sort_values():
-        for iv in intervals:
-            projected = pivot_ts + pd.Timedelta(days=iv)
-            if is_business_day(projected, holiday_set):
-                results.append((pivot_ts, iv, projected))
-            else:
-                before = projected
-                after  = projected
-                while not is_business_day(before, holiday_set):
-                    before -= pd.Timedelta(days=1)
-                while not is_business_day(after, holiday_set):
-                    after  += pd.Timedelta(days=1)
-                results.append((pivot_ts, iv, before))
+    In bar mode ``bar_minutes`` may be passed in (e.g. a cached ``detect_bar_minutes`` result)
+    so repeated projections over the same data skip the bar-size scan.
+    """
+    # Pivots in time order, sorted once as a datetime64 array for either mode
+    pivot_arr = np.sort(pivots_df["idx"].to_numpy(dtype="datetime64[ns]"), kind="stable")
 
+    if use_bars:
+        interval_minutes = bar_minutes or detect_bar_minutes(original_df, holiday_set)
+
+        # Session geometry: bars start at 09:15 and the last one starts an interval before 15:30.
+        # Moving to the next session costs no bars, so every full session holds `bars_per_day` moves.
+        bar = np.timedelta64(interval_minutes, "m")
+        session_open = np.timedelta64(9 * 60 + 15, "m")
+        last_start = np.timedelta64(15 * 60 + 30, "m") - bar
+        bars_per_day = int((last_start - session_open) // bar)
+        if bars_per_day < 1:
+            raise ValueError(f"{interval_minutes}-minute bars do not fit in the 09:15-15:30 session")
+
+        # Bars still available in each pivot's own session (even if beyond data)
+        pivot_days = pivot_arr.astype("datetime64[D]")
+        bars_today = np.maximum((pivot_days + last_start - pivot_arr) // bar, 0)[:, None]
+
+        # 4) Project every pivot & interval at once. Intervals that fit in the pivot's session
+        # just add bars; the others skip whole sessions, then count bars into the landing one
+        # (1..bars_per_day). Sessions are found by rolling back onto a business day, then
+        # offsetting, so weekends/holidays (also past the end of the data) are skipped.
+        iv = np.asarray(intervals, dtype=np.int64)
+        days_ahead, bars_into_day = np.divmod(iv - bars_today - 1, bars_per_day)
+        later_session = np.busday_offset(pivot_days[:, None], days_ahead + 1, roll="backward",
+                                         holidays=holiday_set) + session_open + (bars_into_day + 1) * bar
+
+        # Append even if future date
+        projected = np.where(iv <= bars_today, pivot_arr[:, None] + iv * bar, later_session)
+    else:
+        # --- Calendar-days mode ------------------------------------
+        # Add every interval to every pivot at once, then roll landing dates that are not business
+        # days back to the previous one (time of day is kept)
+        projected = pivot_arr[:, None] + np.asarray(intervals, dtype=np.int64).astype("timedelta64[D]")
+        landing_days = projected.astype("datetime64[D]")
+        rolled_days = np.busday_offset(landing_days, 0, roll="backward", holidays=holiday_set)
+        projected = projected - (landing_days - rolled_days)
+
+    # Timestamps are boxed once, when the result tuples are built
+    results = list(zip(
+        pd.DatetimeIndex(np.repeat(pivot_arr, len(intervals))),
+        list(intervals) * len(pivot_arr),
+        pd.DatetimeIndex(projected.ravel()),
+    ))
     return results
 
 def count_overlaps(hits: list[tuple[pd.Timestamp, int, pd.Timestamp]]) -> dict[pd.Timestamp, int]:
-    from collections import Counter
-    return dict(Counter(hit[2] for hit in hits))
+    # Count projected dates as int64 nanoseconds with one sort-based np.unique (no Timestamp hashing)
+    projected = np.fromiter((hit[2].value for hit in hits), dtype=np.int64, count=len(hits))
+    dates, counts = np.unique(projected.view("datetime64[ns]"), return_counts=True)
+    return dict(zip(pd.DatetimeIndex(dates), counts.tolist()))
@@ -5,9 +5,103 @@ from __future__ import annotations
 import pandas as pd
 import numpy as np
 from .debugger import log_exceptions
+from ._numba import njit
+from ._rolling import RollingWindows
+
+# Candidate status codes returned by the scan kernel
+_VALID, _SMALL_MOVE, _NOT_BEYOND_PREV, _NOT_BEYOND_NEXT = 0, 1, 2, 3
+
+
+@njit(cache=True)
+def _pivot_candidates(highs, lows, high_max, low_min, rng, min_move, return_all):
+    """Scan bars with ``rng`` neighbours on each side for pivot highs/lows.
+
+    ``high_max``/``low_min`` are the trailing-window extremes of ``RollingWindows``.
+
+    Returns ``(count, pos, is_low, status, first, second)`` filled up to ``count``. For valid and
+    small-move candidates ``first``/``second`` are the moves against the previous/next window; for
+    one-sided candidates ``first`` is the extreme of the window the bar did not beat.
+    """
+    n = len(highs)
+    size = max(0, 2 * (n - 2 * rng))
+    pos = np.empty(size, dtype=np.int64)
+    is_low = np.empty(size, dtype=np.bool_)
+    status = np.empty(size, dtype=np.int8)
+    first = np.empty(size, dtype=highs.dtype)
+    second = np.empty(size, dtype=highs.dtype)
+    count = 0
+
+    for i in range(rng, n - rng):
+        # Bar values read once per iteration
+        h = highs[i]
+        l = lows[i]
+
+        # windows excluding the pivot bar for symmetry: bars i-rng..i-1 end at i-1, bars i+1..i+rng at i+rng
+        prev_high = high_max[i - 1]
+        next_high = high_max[i + rng]
+        prev_low = low_min[i - 1]
+        next_low = low_min[i + rng]
+
+        # Check Pivot High
+        above_prev = h > prev_high
+        above_next = h > next_high
+        if above_prev and above_next:
+            move_prev = h - prev_low
+            move_next = h - next_low
+            achieved = move_prev >= min_move and move_next >= min_move
+            if achieved or return_all:
+                pos[count], is_low[count] = i, False
+                status[count] = _VALID if achieved else _SMALL_MOVE
+                first[count], second[count] = move_prev, move_next
+                count += 1
+        elif return_all and (above_prev or above_next):
+            pos[count], is_low[count] = i, False
+            if above_next:
+                status[count], first[count] = _NOT_BEYOND_PREV, prev_high
+            else:
+                status[count], first[count] = _NOT_BEYOND_NEXT, next_high
+            count += 1
+
+        # Check Pivot Low
+        below_prev = l < prev_low
+        below_next = l < next_low
+        if below_prev and below_next:
+            move_prev = prev_high - l
+            move_next = next_high - l
+            achieved = move_prev >= min_move and move_next >= min_move
+            if achieved or return_all:
+                pos[count], is_low[count] = i, True
+                status[count] = _VALID if achieved else _SMALL_MOVE
+                first[count], second[count] = move_prev, move_next
+                count += 1
+        elif return_all and (below_prev or below_next):
+            pos[count], is_low[count] = i, True
+            if below_next:
+                status[count], first[count] = _NOT_BEYOND_PREV, prev_low
+            else:
+                status[count], first[count] = _NOT_BEYOND_NEXT, next_low
+            count += 1
+
+    return count, pos, is_low, status, first, second
+
+
+def _two_decimals(values: np.ndarray) -> np.ndarray:
+    """Format values like ``f"{v:.2f}"``; prices repeat, so each distinct value is formatted once."""
+    uniques, codes = np.unique(values, return_inverse=True)
+    return np.array([f"{v:.2f}" for v in uniques.tolist()], dtype=str)[codes]
+
+
+def _concat(*parts) -> np.ndarray:
+    """Element-wise concatenation of string arrays and scalars."""
+    result = np.asarray(parts[0], dtype=str)
+    for part in parts[1:]:
+        result = np.char.add(result, part)
+    return result
+
 
 @log_exceptions
-def detect_pivots(df: pd.DataFrame, pivot_range: int, min_move: float, return_all: bool = True) -> pd.DataFrame:
+def detect_pivots(df: pd.DataFrame, pivot_range: int, min_move: float, return_all: bool = True,
+                  rw: RollingWindows | None = None) -> pd.DataFrame:
     """
     Detect pivot highs and lows with validity tracking.
     
@@ -17,105 +111,53 @@ def detect_pivots(df: pd.DataFrame, pivot_range: int, min_move: float, return_al
         min_move: Minimum price movement required
         return_all: If True, return all potential pivots with validity status
                    If False, return only valid pivots (legacy behavior)
+        rw: Precomputed RollingWindows for this df and pivot_range (built here if omitted)
     
     Returns:
         DataFrame with columns: idx, type, price, abs_move, valid, rejection_reason
     """
     highs = df["High"].values
     lows = df["Low"].values
+    if highs.dtype.kind != "f":
+        highs, lows = highs.astype(np.float64), lows.astype(np.float64)
     idx = df.index.to_numpy()
     rng = pivot_range
-    pivots = []
+    if rw is None:
+        rw = RollingWindows(df, rng)
+    elif rw.window != rng:
+        raise ValueError(f"RollingWindows built for range {rw.window}, not {rng}")
 
-    for i in range(rng, len(df) - rng):
-        # windows excluding the pivot bar for symmetry
-        window_prev_high = highs[i - rng:i]
-        window_next_high = highs[i + 1 : i + rng + 1]
-        window_prev_low  = lows[i - rng:i]
-        window_next_low  = lows[i + 1 : i + rng + 1]
+    # Compare in the price dtype, as numpy does for a float32 array against a Python float
+    move_threshold = highs.dtype.type(min_move)
+    count, positions, is_low, status, first, second = _pivot_candidates(
+        highs, lows, rw.high_max, rw.low_min, rng, move_threshold, return_all)
+    positions, is_low, status = positions[:count], is_low[:count], status[:count]
+    first, second = first[:count], second[:count]
 
-        # Check Pivot High
-        is_higher_than_prev = highs[i] > window_prev_high.max()
-        is_higher_than_next = highs[i] > window_next_high.max()
-        
-        if is_higher_than_prev and is_higher_than_next:
-            # Valid pivot high pattern, check minimum movement
-            move_down_prev = highs[i] - window_prev_low.min()
-            move_down_next = highs[i] - window_next_low.min()
-            min_move_achieved = move_down_prev >= min_move and move_down_next >= min_move
-            
-            if min_move_achieved or return_all:
-                pivots.append({
-                    "idx": idx[i],
-                    "type": "H",
-                    "price": highs[i],
-                    "abs_move": min(move_down_prev, move_down_next),
-                    "valid": min_move_achieved,
-                    "rejection_reason": None if min_move_achieved else 
-                        f"Insufficient movement: prev={move_down_prev:.2f}, next={move_down_next:.2f} < {min_move}"
-                })
-        elif return_all and (is_higher_than_prev or is_higher_than_next):
-            # Potential pivot high that failed basic criteria
-            rejection_parts = []
-            if not is_higher_than_prev:
-                max_prev = window_prev_high.max()
-                rejection_parts.append(f"Not higher than previous {rng} bars (max={max_prev:.2f})")
-            if not is_higher_than_next:
-                max_next = window_next_high.max()
-                rejection_parts.append(f"Not higher than next {rng} bars (max={max_next:.2f})")
-            
-            pivots.append({
-                "idx": idx[i],
-                "type": "H",
-                "price": highs[i],
-                "abs_move": 0,
-                "valid": False,
-                "rejection_reason": "; ".join(rejection_parts)
-            })
+    # Build the frame column-wise from the kernel output
+    piv_df = pd.DataFrame({
+        "idx": idx[positions],
+        "type": pd.Categorical.from_codes(is_low.astype(np.int8), categories=["H", "L"]),
+        "price": np.where(is_low, lows[positions], highs[positions]),
+        # min(first, second) as Python's min: keep `first` unless `second` is smaller (matters for NaN moves)
+        "abs_move": np.where(status >= _NOT_BEYOND_PREV, 0, np.where(second < first, second, first)),
+    })
+    if not return_all:
+        # Legacy behaviour: only valid pivots, without validity columns
+        return piv_df
 
-        # Check Pivot Low
-        is_lower_than_prev = lows[i] < window_prev_low.min()
-        is_lower_than_next = lows[i] < window_next_low.min()
-        
-        if is_lower_than_prev and is_lower_than_next:
-            # Valid pivot low pattern, check minimum movement
-            move_up_prev = window_prev_high.max() - lows[i]
-            move_up_next = window_next_high.max() - lows[i]
-            min_move_achieved = move_up_prev >= min_move and move_up_next >= min_move
-            
-            if min_move_achieved or return_all:
-                pivots.append({
-                    "idx": idx[i],
-                    "type": "L",
-                    "price": lows[i],
-                    "abs_move": min(move_up_prev, move_up_next),
-                    "valid": min_move_achieved,
-                    "rejection_reason": None if min_move_achieved else
-                        f"Insufficient movement: prev={move_up_prev:.2f}, next={move_up_next:.2f} < {min_move}"
-                })
-        elif return_all and (is_lower_than_prev or is_lower_than_next):
-            # Potential pivot low that failed basic criteria
-            rejection_parts = []
-            if not is_lower_than_prev:
-                min_prev = window_prev_low.min()
-                rejection_parts.append(f"Not lower than previous {rng} bars (min={min_prev:.2f})")
-            if not is_lower_than_next:
-                min_next = window_next_low.min()
-                rejection_parts.append(f"Not lower than next {rng} bars (min={min_next:.2f})")
-            
-            pivots.append({
-                "idx": idx[i],
-                "type": "L",
-                "price": lows[i],
-                "abs_move": 0,
-                "valid": False,
-                "rejection_reason": "; ".join(rejection_parts)
-            })
-
-    piv_df = pd.DataFrame(pivots)
-    
-    # For backward compatibility, filter to valid pivots if return_all is False
-    if not return_all and not piv_df.empty:
-        piv_df = piv_df[piv_df["valid"]].drop(columns=["valid", "rejection_reason"])
-    
+    # Rejection messages, built column-wise and only for rejected rows
+    reasons = np.full(count, None, dtype=object)
+    small = status == _SMALL_MOVE
+    reasons[small] = _concat("Insufficient movement: prev=", _two_decimals(first[small]), ", next=",
+                             _two_decimals(second[small]), f" < {min_move}")
+    # Potential pivots that beat only one side; `first` is the extreme of the side they did not beat
+    one_sided = status >= _NOT_BEYOND_PREV
+    low = is_low[one_sided]
+    reasons[one_sided] = _concat(np.where(low, "Not lower than ", "Not higher than "),
+                                 np.where(status[one_sided] == _NOT_BEYOND_PREV, "previous", "next"),
+                                 f" {rng} bars (", np.where(low, "min=", "max="),
+                                 _two_decimals(first[one_sided]), ")")
+    piv_df["valid"] = status == _VALID
+    piv_df["rejection_reason"] = reasons
     return piv_df
@@ -8,6 +8,9 @@ import pandas as pd
 import numpy as np
 from typing import Tuple, Optional
 from .debugger import log_exceptions
+from ._rolling import RollingWindows
+
+TRIANGLE_TYPES = ("equilateral", "isosceles", "scalene")
 
 
 @log_exceptions
@@ -75,9 +78,13 @@ def analyze_triangle_formation(
     pivot_price: float,
     pivot_type: str,
     time_scale: float,
-    tolerance: float
+    tolerance: float,
+    rw: Optional[RollingWindows] = None
 ) -> Optional[dict]:
-    """Analyze triangle formation for a pivot (high or low)."""
+    """Analyze triangle formation for a pivot (high or low).
+
+    With ``rw`` built for ``pivot_range`` the base points are looked up instead of searched.
+    """
     # Get window boundaries
     left_start = max(0, pivot_idx - pivot_range)
     left_window = df.iloc[left_start:pivot_idx]
@@ -88,22 +95,26 @@ def analyze_triangle_formation(
     if right_window.empty:
         return None
     
-    # Find base points based on pivot type
-    if pivot_type == "H":
+    # Find base points based on pivot type, as bar positions (no index label lookups)
+    if rw is not None and rw.window == pivot_range and pivot_idx > 0:
+        # Windows ending just before the pivot and `pivot_range` bars after it
+        extreme_pos = rw.low_argmin if pivot_type == "H" else rw.high_argmax
+        left_bar_idx = int(extreme_pos[pivot_idx - 1])
+        right_bar_idx = int(extreme_pos[pivot_idx + pivot_range])
+        base = df["Low"] if pivot_type == "H" else df["High"]
+    elif pivot_type == "H":
         # For pivot high, find lowest lows on both sides
-        left_idx = left_window["Low"].idxmin()
-        left_price = df.loc[left_idx, "Low"]
-        right_idx = right_window["Low"].idxmin()
-        right_price = df.loc[right_idx, "Low"]
+        left_bar_idx = left_start + int(np.nanargmin(left_window["Low"].to_numpy()))
+        right_bar_idx = pivot_idx + 1 + int(np.nanargmin(right_window["Low"].to_numpy()))
+        base = df["Low"]
     else:  # pivot_type == "L"
         # For pivot low, find highest highs on both sides
-        left_idx = left_window["High"].idxmax()
-        left_price = df.loc[left_idx, "High"]
-        right_idx = right_window["High"].idxmax()
-        right_price = df.loc[right_idx, "High"]
-    
-    left_bar_idx = df.index.get_loc(left_idx)
-    right_bar_idx = df.index.get_loc(right_idx)
+        left_bar_idx = left_start + int(np.nanargmax(left_window["High"].to_numpy()))
+        right_bar_idx = pivot_idx + 1 + int(np.nanargmax(right_window["High"].to_numpy()))
+        base = df["High"]
+
+    left_idx, left_price = df.index[left_bar_idx], base.iat[left_bar_idx]
+    right_idx, right_price = df.index[right_bar_idx], base.iat[right_bar_idx]
     
     # Calculate triangle sides
     apex = (df.index[pivot_idx], pivot_price)
@@ -134,43 +145,105 @@ def analyze_triangle_formation(
     }
 
 
+def _side_length(time_diff_ns: np.ndarray, price_diff: np.ndarray, time_scale: float) -> np.ndarray:
+    """Vectorised ``calculate_distance`` from nanosecond and price differences."""
+    return np.sqrt((time_diff_ns / 86400e9 * time_scale) ** 2 + price_diff ** 2)
+
+
+def _classify_triangles(al: np.ndarray, ar: np.ndarray, lr: np.ndarray, tolerance: float) -> np.ndarray:
+    """Vectorised ``classify_triangle``; returns codes indexing ``TRIANGLE_TYPES``."""
+    # Shortest, middle and longest side without stacking and sorting (median of three is exact)
+    s0 = np.minimum(np.minimum(al, ar), lr)
+    s1 = np.maximum(np.minimum(al, ar), np.minimum(np.maximum(al, ar), lr))
+    s2 = np.maximum(np.maximum(al, ar), lr)
+    # Ratio tests are similarity-invariant; compare by multiplication to avoid divisions
+    ratio = 1 + tolerance / 100
+    return np.select([s2 <= ratio * s0, (s1 <= ratio * s0) | (s2 <= ratio * s1)], [0, 1], 2).astype(np.int8)
+
+
+def _symmetry_scores(
+    left_duration: np.ndarray,
+    right_duration: np.ndarray,
+    left_move: np.ndarray,
+    right_move: np.ndarray
+) -> np.ndarray:
+    """Vectorised ``calculate_symmetry_score`` from bar durations and price moves."""
+    time_symmetry = 100 * (1 - np.abs(left_duration - right_duration) / np.maximum(left_duration, right_duration))
+    move_symmetry = 100 * (1 - np.abs(left_move - right_move) / np.maximum(left_move, right_move))
+    return (time_symmetry + move_symmetry) / 2
+
+
 @log_exceptions
 def filter_pivots_by_triangle(
     df: pd.DataFrame,
     pivots_df: pd.DataFrame,
-    triangle_settings: dict
+    triangle_settings: dict,
+    rw: Optional[RollingWindows] = None
 ) -> pd.DataFrame:
-    """Filter pivots based on triangle formation criteria."""
+    """Filter pivots based on triangle formation criteria.
+
+    ``rw`` is reused when it was built for the triangle pivot range, e.g. the one passed to
+    ``detect_pivots``; otherwise the windows are computed here.
+    """
     if not triangle_settings.get("enabled", False):
         return pivots_df
     
-    filtered_pivots = []
     triangle_types = triangle_settings.get("types", ["equilateral", "isosceles", "scalene"])
     time_scale = triangle_settings.get("time_scale", 10)
     tolerance = triangle_settings.get("tolerance", 10)
     min_symmetry = triangle_settings.get("min_symmetry", 0)
     pivot_range = triangle_settings.get("pivot_range", 5)
     
-    for _, pivot in pivots_df.iterrows():
-        pivot_idx = df.index.get_loc(pivot["idx"])
-        
-        # Analyze triangle for both pivot highs and lows
-        triangle_info = analyze_triangle_formation(
-            df, pivot_idx, pivot_range, pivot["price"], 
-            pivot["type"], time_scale, tolerance
-        )
-        
-        if triangle_info is None:
-            continue
-        
-        # Check if triangle meets criteria
-        if (triangle_info["type"] in triangle_types and
-            triangle_info["symmetry_score"] >= min_symmetry):
-            # Add triangle info to pivot
-            enhanced_pivot = pivot.copy()
-            enhanced_pivot["triangle_type"] = triangle_info["type"]
-            enhanced_pivot["symmetry_score"] = triangle_info["symmetry_score"]
-            enhanced_pivot["triangle_info"] = triangle_info
-            filtered_pivots.append(enhanced_pivot)
-    
-    return pd.DataFrame(filtered_pivots)
+    highs = df["High"].to_numpy(dtype=np.float64)
+    lows = df["Low"].to_numpy(dtype=np.float64)
+    pivot_pos = df.index.get_indexer(pivots_df["idx"]).astype(np.int64)
+    is_high = pivots_df["type"].to_numpy() == "H"
+
+    allowed = np.array([name in triangle_types for name in TRIANGLE_TYPES])
+
+    # Base points from window argmin/argmax arrays: pivot highs sit on the lowest lows either
+    # side, pivot lows on the highest highs. The left window ends at p-1, the right one at
+    # p+range (see RollingWindows).
+    w = int(pivot_range)
+    if rw is None or rw.window != w:
+        rw = RollingWindows(df, w)
+    has_bases = (pivot_pos > 0) & (pivot_pos < len(df) - 1)
+    left_pos = np.where(is_high, rw.low_argmin[pivot_pos - 1], rw.high_argmax[pivot_pos - 1])
+    right_pos = np.where(is_high, rw.low_argmin[pivot_pos + w], rw.high_argmax[pivot_pos + w])
+    left_pos = np.where(has_bases, left_pos, pivot_pos)
+    right_pos = np.where(has_bases, right_pos, pivot_pos)
+
+    # Triangle geometry for every pivot at once, in (scaled days, price) space
+    apex_price = pivots_df["price"].to_numpy(dtype=np.float64)
+    left_price = np.where(is_high, lows[left_pos], highs[left_pos])
+    right_price = np.where(is_high, lows[right_pos], highs[right_pos])
+    left_move = np.abs(apex_price - left_price)
+    right_move = np.abs(apex_price - right_price)
+
+    times_ns = df.index.as_unit("ns").asi8
+    al = _side_length(times_ns[pivot_pos] - times_ns[left_pos], left_move, time_scale)
+    ar = _side_length(times_ns[right_pos] - times_ns[pivot_pos], right_move, time_scale)
+    lr = _side_length(times_ns[right_pos] - times_ns[left_pos], right_price - left_price, time_scale)
+    type_code = _classify_triangles(al, ar, lr, float(tolerance))
+
+    # Reject pivots without bases, flat triangles and unselected shapes before scoring symmetry
+    shape_ok = has_bases & (np.maximum(left_move, right_move) > 0) & allowed[type_code]
+    symmetry = np.full(len(pivot_pos), np.nan)
+    symmetry[shape_ok] = _symmetry_scores(
+        pivot_pos[shape_ok] - left_pos[shape_ok], right_pos[shape_ok] - pivot_pos[shape_ok],
+        left_move[shape_ok], right_move[shape_ok]
+    )
+
+    # Check which triangles meet the criteria
+    keep = shape_ok & (symmetry >= min_symmetry)
+    left_pos, right_pos = left_pos[keep], right_pos[keep]
+
+    # Base-point geometry as flat typed columns (one array per field) for the chart overlay
+    return pivots_df[keep].assign(
+        triangle_type=np.asarray(TRIANGLE_TYPES, dtype=object)[type_code[keep]],
+        symmetry_score=symmetry[keep],
+        left_base_idx=df.index[left_pos],
+        left_base_price=left_price[keep],
+        right_base_idx=df.index[right_pos],
+        right_base_price=right_price[keep],
+    )